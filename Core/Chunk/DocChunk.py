@@ -28,7 +28,9 @@ class DocChunk:
             if isinstance(docs, str):
                 docs = [docs]
 
-            docs = {mdhash_id(doc.strip(), prefix="doc-"): {"content": doc.strip()} for doc in docs}
+            # Keying by content hash drops duplicate documents before they are tokenized
+            stripped_docs = [doc.strip() for doc in docs]
+            docs = {mdhash_id(doc, prefix="doc-"): {"content": doc} for doc in stripped_docs}
         
             flatten_list = list(docs.items())
             docs = [doc[1]["content"] for doc in flatten_list]
@@ -39,7 +41,7 @@ class DocChunk:
 
             for chunk in chunks:
                 chunk["chunk_id"] = mdhash_id(chunk["content"], prefix="chunk-")
-                await self._chunk.upsert(chunk["chunk_id"], TextChunk(**chunk))
+            await self._chunk.upsert_batch([chunk["chunk_id"] for chunk in chunks], [TextChunk(**chunk) for chunk in chunks])
         
             await self._chunk.persist()
         logger.info("✅ Finished the chunking stage")
@@ -1,11 +1,12 @@
-from hashlib import md5
+from hashlib import blake2b
 import html
 from typing import Any, List, Union, Tuple
 import re
-import numbers
 import shutil
 import io
 import csv
+import orjson
+from functools import lru_cache
 from scipy.sparse import csr_matrix
 
 from Core.Common.Logger import logger
@@ -26,8 +27,33 @@ def singleton(cls):
     return get_instance
 
 
-def mdhash_id(content, prefix: str = ""):
-    return prefix + md5(content.encode()).hexdigest()
+# Strings longer than this are encoded and hashed piecewise to avoid a full UTF-8 copy
+_MDHASH_STREAM_THRESHOLD = 1 << 20
+_MDHASH_STREAM_CHUNK = 1 << 16
+
+
+def mdhash_id(content: Union[str, bytes], prefix: str = ""):
+    """Return a short (64-bit BLAKE2b) hex id for the given content; bytes are hashed as-is."""
+    if isinstance(content, str):
+        if len(content) > _MDHASH_STREAM_THRESHOLD:
+            # UTF-8 encoding is concatenative, so hashing encoded slices yields the same digest
+            hasher = blake2b(digest_size=8)
+            for start in range(0, len(content), _MDHASH_STREAM_CHUNK):
+                hasher.update(content[start:start + _MDHASH_STREAM_CHUNK].encode())
+            return prefix + hasher.hexdigest()
+        content = content.encode()
+    return prefix + blake2b(content, digest_size=8).hexdigest()
+
+
+_CONTROL_CHAR_PATTERN = re.compile(r"[\x00-\x1f\x7f-\x9f]")
+_NON_ALNUM_PATTERN = re.compile('[^A-Za-z0-9 ]')
+# ASCII translation table equivalent to the two patterns above: control characters are removed,
+# anything else that is not alphanumeric or a space becomes a space.
+_CLEAN_STR_TABLE = {
+    i: None if (i < 0x20 or i == 0x7f) else ' '
+    for i in range(128)
+    if not (chr(i).isalnum() or chr(i) == ' ')
+}
 
 
 def clean_str(input: Any) -> str:
@@ -37,11 +63,20 @@ def clean_str(input: Any) -> str:
         return input
 
     result = html.unescape(input.strip())
+    if result.isascii():
+        # Fast path: drop control characters and blank out the rest in a single table lookup
+        return result.lower().translate(_CLEAN_STR_TABLE).strip()
+
     # https://stackoverflow.com/questions/4324790/removing-control-characters-from-a-string-in-python
-    result = re.sub(r"[\x00-\x1f\x7f-\x9f]", "", result)
+    result = _CONTROL_CHAR_PATTERN.sub("", result)
 
     # Remove non-alphanumeric characters and convert to lowercase
-    return re.sub('[^A-Za-z0-9 ]', ' ', result.lower()).strip()
+    return _NON_ALNUM_PATTERN.sub(' ', result.lower()).strip()
+
+
+@lru_cache(maxsize=64)
+def _compile_splitter(delimiters: Tuple[str, ...]) -> re.Pattern:
+    return re.compile("|".join(re.escape(delimiter) for delimiter in delimiters))
 
 
 def split_string_by_multi_markers(
@@ -59,9 +94,8 @@ def split_string_by_multi_markers(
     """
     if not delimiters:
         return [text]
-    split_pattern = "|".join(re.escape(delimiter) for delimiter in delimiters)
-    segments = re.split(split_pattern, text)
-    return [segment.strip() for segment in segments if segment.strip()]
+    segments = _compile_splitter(tuple(delimiters)).split(text)
+    return [segment for segment in (segment.strip() for segment in segments) if segment]
 
 
 def is_float_regex(value: str) -> bool:
@@ -79,20 +113,20 @@ def is_float_regex(value: str) -> bool:
 
 # Json operations
 
-import json
 import os
 
 
 def write_json(json_obj, file_name):
-    with open(file_name, "w", encoding="utf-8") as f:
-        json.dump(json_obj, f, indent=2, ensure_ascii=False)
+    # orjson always emits UTF-8 (no ASCII escaping), matching the previous `ensure_ascii=False`
+    with open(file_name, "wb") as f:
+        f.write(orjson.dumps(json_obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
 
 def load_json(file_name):
     if not os.path.exists(file_name):
         return None
-    with open(file_name, encoding="utf-8") as f:
-        return json.load(f)
+    with open(file_name, "rb") as f:
+        return orjson.loads(f.read())
 
 
 def community_report_from_json(parsed_output: dict) -> str:
@@ -122,20 +156,14 @@ def community_report_from_json(parsed_output: dict) -> str:
 
 
 def list_to_quoted_csv_string(data: List[List[Any]]) -> str:
-    """Converts a list of lists into a CSV formatted string with quoted values."""
-
-    def enclose_string_with_quotes(content: Any) -> str:
-        if isinstance(content, numbers.Number):
-            return str(content)
-        content = str(content).strip().strip("'").strip('"')
-        return f'"{content}"'
-
-    return "\n".join(
-        [
-            ",\t".join([enclose_string_with_quotes(data_dd) for data_dd in data_d])
-            for data_d in data
-        ]
-    )
+    """Converts a list of lists into a CSV formatted string with quoted values.
+
+    Numbers are written bare and everything else is quoted (embedded quotes are doubled).
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, quoting=csv.QUOTE_NONNUMERIC, delimiter=",", lineterminator="\n")
+    writer.writerows(data)
+    return output.getvalue().rstrip("\n")
 
 
 def parse_value_from_string(value: str):
@@ -148,24 +176,46 @@ def parse_value_from_string(value: str):
     Returns:
         The value converted to its appropriate type (e.g., int, float, bool, str).
     """
+    lowered = value.lower()
+    if lowered == 'true':
+        return True
+    if lowered == 'false':
+        return False
     try:
-        if value.lower() == 'true':
-            return True
-        elif value.lower() == 'false':
-            return False
-        elif value.isdigit():
+        if value.lstrip('-+').isdigit():
             return int(value)
-        else:
-            return float(value) if '.' in value else value.strip('"')
+        if '.' in value:
+            return float(value)
     except ValueError:
-        return value
+        pass
+    return value.strip('"')
+
+
+_KEY_VALUE_PATTERN = re.compile(r'(?P<key>"?\w+"?)\s*:\s*(?P<value>{[^}]*}|".*?"|[^,}]+)', re.DOTALL)
+_BRACE_PATTERN = re.compile(r'[{}]')
+
+
+def _first_balanced_object(response: str) -> Union[str, None]:
+    """Return the first brace-balanced {...} substring of the response, if any."""
+    depth, start = 0, None
+    for match in _BRACE_PATTERN.finditer(response):
+        if match.group() == '{':
+            if depth == 0:
+                start = match.start()
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                return response[start:match.end()]
+    return None
 
 
 def prase_json_from_response(response: str) -> dict:
     """
     Extract JSON data from a string response.
 
-    This function attempts to extract the first complete JSON object from the response.
+    This function first parses the response (or its outermost {...} slice) as JSON, then the first
+    complete JSON object in it, so a response holding several objects yields the first one.
     If that fails, it tries to extract key-value pairs from a potentially malformed JSON string.
 
     Args:
@@ -173,34 +223,35 @@ def prase_json_from_response(response: str) -> dict:
     Returns:
         A dictionary containing the extracted JSON data.
     """
-    stack = []
-    first_json_start = None
-
-    # Attempt to extract the first complete JSON object using a stack to track braces
-    for i, char in enumerate(response):
-        if char == '{':
-            stack.append(i)
-            if first_json_start is None:
-                first_json_start = i
-        elif char == '}':
-            if stack:
-                start = stack.pop()
-                if not stack:
-                    first_json_str = response[first_json_start:i + 1]
-                    try:
-                        # Attempt to parse the JSON string
-                        return json.loads(first_json_str.replace("\n", ""))
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON decoding failed: {e}. Attempted string: {first_json_str[:50]}...")
-                        break
-                    finally:
-                        first_json_start = None
+    # Fast path: the whole response is a well-formed JSON object
+    try:
+        parsed = orjson.loads(response)
+        if isinstance(parsed, dict):
+            return parsed
+    except orjson.JSONDecodeError:
+        pass
+
+    # Otherwise, try the outermost {...} slice (e.g., JSON wrapped in prose or code fences)
+    first_json_start, last_json_end = response.find('{'), response.rfind('}')
+    if first_json_start != -1 and last_json_end > first_json_start:
+        json_str = response[first_json_start:last_json_end + 1]
+        try:
+            parsed = orjson.loads(json_str.replace("\n", ""))
+            if isinstance(parsed, dict):
+                return parsed
+        except orjson.JSONDecodeError:
+            # Several objects (or braces in prose) around the JSON: fall back to the first complete object
+            first_json_str = _first_balanced_object(response)
+            if first_json_str is not None:
+                try:
+                    return orjson.loads(first_json_str.replace("\n", ""))
+                except orjson.JSONDecodeError as e:
+                    logger.error(f"JSON decoding failed: {e}. Attempted string: {first_json_str[:50]}...")
 
     # If extraction of complete JSON failed, try extracting key-value pairs from a non-standard JSON string
     extracted_values = {}
-    regex_pattern = r'(?P<key>"?\w+"?)\s*:\s*(?P<value>{[^}]*}|".*?"|[^,}]+)'
 
-    for match in re.finditer(regex_pattern, response, re.DOTALL):
+    for match in _KEY_VALUE_PATTERN.finditer(response):
         key = match.group('key').strip('"')  # Strip quotes from key
         value = match.group('value').strip()
 
@@ -219,21 +270,28 @@ def prase_json_from_response(response: str) -> dict:
     return extracted_values
 
 
+@lru_cache(maxsize=8)
+def get_encoder(model_name: str):
+    return tiktoken.get_encoding(model_name)
+
+
 def encode_string_by_tiktoken(content: str, model_name: str = "cl100k_base"):
-    ENCODER = tiktoken.get_encoding(model_name)
-    tokens = ENCODER.encode(content)
-    return tokens
+    return get_encoder(model_name).encode(content)
+
+
+def token_counts(texts: list[str], model_name: str = "cl100k_base") -> list[int]:
+    """Count the tokens of every text in one batched (multi-threaded) tiktoken call."""
+    return [len(tokens) for tokens in get_encoder(model_name).encode_batch(texts, num_threads=8)]
 
 
 def truncate_list_by_token_size(list_data: list, key: callable, max_token_size: int):
     """Truncate a list of data based on the token size."""
-    # Default: cl100k_base
     if max_token_size <= 0:
         return []
+    # Tokenize the whole list in one batched call instead of one call per element
     tokens = 0
     result = []
-    for data in list_data:
-        token_count = len(encode_string_by_tiktoken(key(data)))
+    for data, token_count in zip(list_data, token_counts([key(data) for data in list_data])):
         if tokens + token_count > max_token_size:
             break
         tokens += token_count
@@ -247,9 +305,14 @@ def min_max_normalize(x):
 
     Args:
         x (list): A list of values to normalize.
-        Returns: A list of normalized values.
+        Returns: A list of normalized values. All zeros if every value is identical.
     """
-    return (x - np.min(x)) / (np.max(x) - np.min(x))
+    x = np.asarray(x)
+    lo = x.min()
+    value_range = x.max() - lo
+    if value_range > 0:
+        return (x - lo) / value_range
+    return np.zeros_like(x, dtype=float)
 
 
 def get_class_name(cls) -> str:
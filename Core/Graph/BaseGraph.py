@@ -20,6 +20,8 @@ from Core.Utils.MergeER import MergeEntity, MergeRelationship
 
 
 class BaseGraph(ABC):
+    # Number of merged nodes / edges written to the graph storage per bulk upsert
+    UPSERT_BATCH_SIZE = 10000
 
     def __init__(self, config, llm, encoder):
         self.working_memory: Memory = Memory()  # Working memory
@@ -65,6 +67,12 @@ class BaseGraph(ABC):
         self._graph.namespace = namespace
 
     async def _merge_nodes_then_upsert(self, entity_name: str, nodes_data: List[Entity]):
+        node_data = await self._merge_nodes(entity_name, nodes_data)
+        # Upsert the node with the merged data
+        await self._graph.upsert_node(entity_name, node_data=node_data)
+
+    async def _merge_nodes(self, entity_name: str, nodes_data: List[Entity]) -> dict:
+        """Merge the extracted entities with the existing node and return the node data to upsert."""
         existing_node = await self._graph.get_node(entity_name)
 
         existing_data = build_data_for_merge(existing_node) if existing_node else defaultdict(list)
@@ -88,13 +96,25 @@ class BaseGraph(ABC):
         new_entity_type = (MergeEntity.merge_types(existing_data["entity_type"], upsert_nodes_data[
             "entity_type"]) if self.config.enable_entity_type else "")
 
-        node_data = dict(source_id=source_id, entity_name=entity_name, entity_type=new_entity_type,
-                         description=description)
-       
-        # Upsert the node with the merged data
-        await self._graph.upsert_node(entity_name, node_data=node_data)
+        return dict(source_id=source_id, entity_name=entity_name, entity_type=new_entity_type,
+                    description=description)
 
     async def _merge_edges_then_upsert(self, src_id: str, tgt_id: str, edges_data: List[Relationship]) -> None:
+        edge_data = await self._merge_edges(src_id, tgt_id, edges_data)
+        # Ensure src_id and tgt_id nodes exist
+        for node_id in (src_id, tgt_id):
+            if not await self._graph.has_node(node_id):
+                # Upsert node with source_id and entity_name
+                await self._graph.upsert_node(node_id, node_data=self._placeholder_node_data(node_id, edge_data))
+        # Upsert the edge with the merged data
+        await self._graph.upsert_edge(src_id, tgt_id, edge_data=edge_data)
+
+    @staticmethod
+    def _placeholder_node_data(node_id: str, edge_data: dict) -> dict:
+        return dict(source_id=edge_data["source_id"], entity_name=node_id, entity_type="", description="")
+
+    async def _merge_edges(self, src_id: str, tgt_id: str, edges_data: List[Relationship]) -> dict:
+        """Merge the extracted relationships with the existing edge and return the edge data to upsert."""
         # Check if the edge exists and fetch existing data
         existing_edge = await self._graph.get_edge(src_id, tgt_id) if await self._graph.has_edge(src_id,
                                                                                                  tgt_id) else None
@@ -129,21 +149,10 @@ class BaseGraph(ABC):
         relation_name = (MergeRelationship.merge_relation_name(existing_edge_data["relation_name"],
                                                                upsert_edge_data[
                                                                    "relation_name"]) if self.config.enable_edge_name else "")
-        # Ensure src_id and tgt_id nodes exist
-        for node_id in (src_id, tgt_id):
-            if not await self._graph.has_node(node_id):
-                # Upsert node with source_id and entity_name
-                await self._graph.upsert_node(
-                    node_id,
-                    node_data=dict(source_id=source_id, entity_name=node_id, entity_type="", description="")
-                )
-
         # Create edge_data with merged data
-        edge_data = dict(weight=total_weight, source_id=source_id,
-                         relation_name=relation_name, keywords=keywords, description=description, src_id=src_id,
-                         tgt_id=tgt_id)
-        # Upsert the edge with the merged data
-        await self._graph.upsert_edge(src_id, tgt_id, edge_data=edge_data)
+        return dict(weight=total_weight, source_id=source_id,
+                    relation_name=relation_name, keywords=keywords, description=description, src_id=src_id,
+                    tgt_id=tgt_id)
 
     @abstractmethod
     def _extract_entity_relationship(self, chunk_key_pair: tuple[str, TextChunk]):
@@ -228,11 +237,26 @@ class BaseGraph(ABC):
             for k, v in m_edges.items():
                 maybe_edges[tuple(sorted(k))].extend(v)
 
-        # Asynchronously merge and upsert nodes
-        await asyncio.gather(*[self._merge_nodes_then_upsert(k, v) for k, v in maybe_nodes.items()])
-
-        # Asynchronously merge and upsert edges
-        await asyncio.gather(*[self._merge_edges_then_upsert(k[0], k[1], v) for k, v in maybe_edges.items()])
+        # Asynchronously merge nodes, then upsert them in bulk
+        merged_nodes = await asyncio.gather(*[self._merge_nodes(k, v) for k, v in maybe_nodes.items()])
+        for batch in self._upsert_batches(list(zip(maybe_nodes.keys(), merged_nodes))):
+            await self._graph.upsert_nodes(batch)
+
+        # Asynchronously merge edges, then upsert them (and any endpoint not extracted as an entity) in bulk
+        merged_edges = await asyncio.gather(*[self._merge_edges(k[0], k[1], v) for k, v in maybe_edges.items()])
+        missing_nodes = {}
+        for (src_id, tgt_id), edge_data in zip(maybe_edges.keys(), merged_edges):
+            for node_id in (src_id, tgt_id):
+                if node_id not in missing_nodes and not await self._graph.has_node(node_id):
+                    missing_nodes[node_id] = self._placeholder_node_data(node_id, edge_data)
+        for batch in self._upsert_batches(list(missing_nodes.items())):
+            await self._graph.upsert_nodes(batch)
+        for batch in self._upsert_batches(
+                [(k[0], k[1], edge_data) for k, edge_data in zip(maybe_edges.keys(), merged_edges)]):
+            await self._graph.upsert_edges(batch)
+
+    def _upsert_batches(self, items: list) -> list[list]:
+        return [items[i:i + self.UPSERT_BATCH_SIZE] for i in range(0, len(items), self.UPSERT_BATCH_SIZE)]
 
     async def _handle_entity_relation_summary(self, entity_or_relation_name: str, description: str) -> str:
         """
@@ -406,7 +430,8 @@ class BaseGraph(ABC):
     async def personalized_pagerank(self, reset_prob_chunk, damping:float = 0.1):
         pageranked_probabilities = []
         igraph_ = ig.Graph.from_networkx(self._graph.graph)
-        igraph_.es['weight'] = [await self.get_edge_weight(edge[0], edge[1]) for edge in list(await self.edges())]
+        # Read the weights in the same traversal as the edges (same order as `from_networkx`)
+        igraph_.es['weight'] = [weight for _, _, weight in self._graph.graph.edges(data="weight")]
 
         for reset_prob in reset_prob_chunk:
             pageranked_probs = igraph_.personalized_pagerank(vertices=range(self.node_num), damping=damping, directed=False,
@@ -170,10 +170,10 @@ class GraphRAG(ContextMixin, BaseModel):
    
         logger.info("Building retriever context for the current execution")
         try:
-            for context_name, use_context in self._retriever_context.items():
-                if use_context:
-                    self.retriever_context.register_context(context_name, getattr(self, context_name))
-                    
+            self.retriever_context.register_many(
+                {context_name: getattr(self, context_name) for context_name, use_context in
+                 self._retriever_context.items() if use_context})
+
             self._querier = get_query(self.config.query_type, self.retriever_context)
 
         except Exception as e:
@@ -250,11 +250,11 @@ class GraphRAG(ContextMixin, BaseModel):
         if self.config.use_relations_vdb:
             edge_metadata = await self.graph.edge_metadata()
             if not edge_metadata:
+                # Skip only the relation index; the community and retriever stages below still have to run
                 logger.warning("No edge metadata found. Skipping relation indexing.")
-                return
-            await self.relations_vdb.build_index(await self.graph.edges_data(), edge_metadata, force=False)
+            else:
+                await self.relations_vdb.build_index(await self.graph.edges_data(), edge_metadata, force=False)
 
-          
         if self.config.use_community:
 
             await self.community.cluster(largest_cc=await self.graph.stable_largest_cc(),
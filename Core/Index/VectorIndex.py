@@ -44,16 +44,15 @@ class VectorIndex(BaseIndex):
         pass
 
     async def _update_index(self, datas: list[dict[str:Any]], meta_data: list):
-        async def process_document(data):
-            document = Document(
+        documents = [
+            Document(
                 doc_id=mdhash_id(data["content"]),
                 text=data["content"],
                 metadata={key: data[key] for key in meta_data},
                 excluded_embed_metadata_keys=meta_data,
             )
-            return document
-
-        documents = await asyncio.gather(*[process_document(data) for data in datas])
+            for data in datas
+        ]
         parser = SimpleNodeParser.from_defaults()
         nodes = parser.get_nodes_from_documents(documents)
         self._index = VectorStoreIndex(nodes)
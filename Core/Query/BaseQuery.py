@@ -1,16 +1,38 @@
 import asyncio
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from hashlib import blake2b
 from Core.Retriever.MixRetriever import MixRetriever
 from typing import Any
 from Core.Prompt import GraphPrompt, QueryPrompt
-from Core.Common.Utils import clean_str, prase_json_from_response, truncate_list_by_token_size, list_to_quoted_csv_string
+from Core.Common.Utils import token_counts, clean_str, prase_json_from_response, list_to_quoted_csv_string
 from Core.Common.Logger import logger
 
 class BaseQuery(ABC):
+    # Maximum number of queries whose NER / keyword extraction results are kept in memory
+    EXTRACTION_CACHE_SIZE = 1024
+
     def __init__(self, retirever_context):
         self._retirever = MixRetriever(retirever_context)
         self.config = self._retirever.config
         self.llm = self._retirever.llm
+        self._ner_cache: OrderedDict[bytes, list[str]] = OrderedDict()
+        self._keywords_cache: OrderedDict[bytes, dict] = OrderedDict()
+
+    @staticmethod
+    def _extraction_cache_key(query: str) -> bytes:
+        return blake2b(query.encode(), digest_size=8).digest()
+
+    def _get_cached_extraction(self, cache: OrderedDict, key: bytes):
+        if key not in cache:
+            return None
+        cache.move_to_end(key)
+        return cache[key]
+
+    def _cache_extraction(self, cache: OrderedDict, key: bytes, value):
+        cache[key] = value
+        if len(cache) > self.EXTRACTION_CACHE_SIZE:
+            cache.popitem(last=False)
     
     @abstractmethod
     async def _retrieve_relevant_contexts(self):
@@ -26,6 +48,11 @@ class BaseQuery(ABC):
     
     
     async def extract_query_entities(self, query):
+        cache_key = self._extraction_cache_key(query)
+        cached_entities = self._get_cached_extraction(self._ner_cache, cache_key)
+        if cached_entities is not None:
+            return list(cached_entities)
+
         entities = []
         try:
             ner_messages = GraphPrompt.NER.format(user_input=query)
@@ -36,18 +63,25 @@ class BaseQuery(ABC):
             if 'named_entities' not in entities:
                 entities = []
             else:
-                entities = entities['named_entities']
-
-            entities = [clean_str(p) for p in entities]
+                entities = [clean_str(p) for p in entities['named_entities']]
+                # Only successful extractions are cached, so a malformed response is retried next time
+                self._cache_extraction(self._ner_cache, cache_key, list(entities))
         except Exception as e:
             logger.error('Error in Retrieval NER: {}'.format(e))
 
         return entities
     async def extract_query_keywords(self, query, mode = "low"):
-        kw_prompt = QueryPrompt.KEYWORDS_EXTRACTION.format(query=query)
-        result = await self.llm.aask(kw_prompt)
+        # The LLM output does not depend on `mode`, so cache the parsed response per query
+        cache_key = self._extraction_cache_key(query)
+        keywords_data = self._get_cached_extraction(self._keywords_cache, cache_key)
+        if keywords_data is None:
+            kw_prompt = QueryPrompt.KEYWORDS_EXTRACTION.format(query=query)
+            result = await self.llm.aask(kw_prompt)
 
-        keywords_data = prase_json_from_response(result)
+            keywords_data = prase_json_from_response(result)
+            # Only successful extractions are cached, so an unparseable response is retried next time
+            if keywords_data:
+                self._cache_extraction(self._keywords_cache, cache_key, keywords_data)
         if mode == "low":
             keywords = keywords_data.get("low_level_keywords", [])
             keywords = ", ".join(keywords)
@@ -55,8 +89,9 @@ class BaseQuery(ABC):
             keywords = keywords_data.get("high_level_keywords", [])
             keywords = ", ".join(keywords)
         elif mode == "hybrid":
-           low_level = keywords_data.get("low_level_keywords", [])
-           high_level = keywords_data.get("high_level_keywords", [])
+           # Copies, so callers cannot mutate the cached response
+           low_level = list(keywords_data.get("low_level_keywords", []))
+           high_level = list(keywords_data.get("high_level_keywords", []))
            keywords = [low_level, high_level]
 
         return keywords
@@ -69,15 +104,20 @@ class BaseQuery(ABC):
         ):
             
             #TODO: support other type of context filter
+            # Tokenize every report once, then partition with a running token sum
+            report_token_counts = token_counts([c["report_string"] for c in communities_data])
+            max_token_size = self.config.global_max_token_for_community_report
             community_groups = []
-            while len(communities_data):
-                this_group = truncate_list_by_token_size(
-                    communities_data,
-                    key=lambda x: x["report_string"],
-                    max_token_size=self.config.global_max_token_for_community_report,
-                )
+            this_group, this_group_tokens = [], 0
+            for community, token_count in zip(communities_data, report_token_counts):
+                # A report larger than the budget on its own still gets a group of its own
+                if this_group and this_group_tokens + token_count > max_token_size:
+                    community_groups.append(this_group)
+                    this_group, this_group_tokens = [], 0
+                this_group.append(community)
+                this_group_tokens += token_count
+            if this_group:
                 community_groups.append(this_group)
-                communities_data = communities_data[len(this_group) :]
 
             async def _process(community_truncated_datas: list[Any]) -> dict:
                 communities_section_list = [["id", "content", "rating", "importance"]]
@@ -104,6 +144,4 @@ class BaseQuery(ABC):
      
             logger.info(f"Grouping to {len(community_groups)} groups for global search")
             responses = await asyncio.gather(*[_process(c) for c in community_groups])
-            import pdb
-            pdb.set_trace()
             return responses
\ No newline at end of file
@@ -5,6 +5,9 @@ class RetrieverContext:
     context: dict = field(default_factory=dict)
     def register_context(self, key, value):
        self.context[key] = value
+
+    def register_many(self, contexts: dict):
+       self.context.update(contexts)
        
     @property
     def as_dict(self):
@@ -38,6 +38,12 @@ class BaseGraphStorage(BaseStorage):
     ):
         raise NotImplementedError
 
+    async def upsert_nodes(self, items: list[tuple[str, dict[str, str]]]):
+        raise NotImplementedError
+
+    async def upsert_edges(self, items: list[tuple[str, str, dict[str, str]]]):
+        raise NotImplementedError
+
     async def clustering(self, algorithm: str):
         raise NotImplementedError
 
@@ -41,13 +41,12 @@ class ChunkKVStorage(BaseKVStorage):
 
 
     async def upsert_batch(self, keys, values) -> None:
-        for key, value in zip(keys, values):
-            self._chunk[key] = value
-            index = self._key_to_index.get(key, None)
-            if index is None:
-                index = value.index
-                self._key_to_index[key] = index
-                self._data[index] = value
+        # Same semantics as calling `upsert` per key, but with one dict update per mapping
+        items = list(zip(keys, values))
+        self._chunk.update(items)
+        self._key_to_index.update((key, value.index) for key, value in items if key not in self._key_to_index)
+        self._data.update((self._key_to_index[key], value) for key, value in items)
+
     async def upsert(self, key, value) -> None:
         
         self._chunk[key] = value
@@ -68,10 +67,7 @@ class ChunkKVStorage(BaseKVStorage):
 
     
     async def chunk_datas(self):
-        inserting_chunks = {key: value for key, value in self._chunk.items() if key in self._chunk}
-
-        
-        return list(inserting_chunks.items())
+        return list(self._chunk.items())
 
     @property
     def dat_idx_pkl_file(self):
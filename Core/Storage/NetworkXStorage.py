@@ -1,64 +1,160 @@
+import hashlib
 import html
 import json
 import os
+import pickle
+import re
+import sys
 from collections import defaultdict
-from typing import Any, Union, cast
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+import igraph as ig
 import networkx as nx
 import numpy as np
-from pydantic import model_validator
-import asyncio
 from Core.Common.Constants import GRAPH_FIELD_SEP
 from Core.Common.Logger import logger
 from Core.Schema.CommunitySchema import LeidenInfo
 from Core.Storage.BaseGraphStorage import BaseGraphStorage
 
+# Chunk ids were 128-bit MD5 digests before `mdhash_id` switched to 64-bit BLAKE2b; graphs referencing them
+# no longer match the (always re-chunked) chunk storage and have to be rebuilt
+_LEGACY_CHUNK_ID_PATTERN = re.compile(r"chunk-[0-9a-f]{32}(?![0-9a-f])")
+
 
 class NetworkXStorage(BaseGraphStorage):
     def __init__(self):
         super().__init__()
         self.edge_list = None
         self.node_list = None
-
-    name: str = "nx_data.graphml"  # The valid file name for NetworkX
+        self._node_embed_algorithms = {
+            "node2vec": self._node2vec_embed,
+        }
+        # Bumped on every structural mutation (upsert / load); derived caches remember the generation they were built at
+        self._mut_counter = 0
+        # Cached result of `stable_largest_connected_component` as (generation, graph)
+        self._lcc_cache: Union[tuple[int, nx.Graph], None] = None
+        # Parsed form of each node's JSON "clusters" attribute
+        self._parsed_clusters: dict[str, list[dict[str, str]]] = {}
+        # Split "source_id" of each node, valid for the generation in `_node_chunk_ids_version`
+        self._node_chunk_ids: dict[str, frozenset[str]] = {}
+        self._node_chunk_ids_version = -1
+        # CSR snapshot of the graph (rows follow `_node_ids`), rebuilt lazily after mutations, see `_ensure_csr`
+        self._csr_version = -1
+        self._node_ids = None
+        self._node_id_to_idx = None
+        self._csr_indptr = None
+        self._csr_indices = None
+        self._csr_data = None
+        self._csr_degree = None
+        # Memoized node2vec output as ((generation, params hash), embeddings, node ids), see `_node2vec_embed`
+        self._node2vec_cache: Union[tuple[tuple[int, str], np.ndarray, list[str]], None] = None
+        # Set when the graph file on disk is outdated and must be overwritten by the rebuilt graph
+        self._stale_graph_file = False
+
+    name: str = "nx_data.pkl"  # The valid file name for NetworkX
+    graphml_name: str = "nx_data.graphml"  # GraphML file written by earlier versions
+    parallel_bitset_words: int = 1 << 18  # Bitset words per parent above which containment checks run in threads
+    node2vec_name: str = "node2vec.npz"  # node2vec embeddings persisted next to the graph
     _graph: nx.Graph = nx.Graph()
+    node2vec_params: dict = dict(
+        dimensions=1536,
+        num_walks=10,
+        walk_length=40,
+        window_size=2,
+        iterations=3,
+        random_seed=3,
+        p=1.0,
+        q=1.0,
+        # Multi-worker Word2Vec and the cuGraph walks are not reproducible even with `random_seed`;
+        # set this to use a single Word2Vec worker and the seeded CPU walks
+        deterministic=False,
+    )
 
     def load_nx_graph(self) -> bool:
-        # Attempting to load the graph from the specified GraphML file
-        logger.info(f"Attempting to load the graph from: {self.graphml_xml_file}")
-        if os.path.exists(self.graphml_xml_file):
+        # Graphs persisted by earlier versions as GraphML are loaded once and migrated to pickle
+        from_graphml = not os.path.exists(self.nx_graph_file) and os.path.exists(self.graphml_xml_file)
+        graph_file = self.graphml_xml_file if from_graphml else self.nx_graph_file
+        logger.info(f"Attempting to load the graph from: {graph_file}")
+        if os.path.exists(graph_file):
             try:
-                self._graph = nx.read_graphml(self.graphml_xml_file)
+                graph = nx.read_graphml(graph_file) if from_graphml else NetworkXStorage.read_nx_graph(graph_file)
+                if NetworkXStorage._has_legacy_chunk_ids(graph):
+                    logger.warning(
+                        f"The graph in {graph_file} references chunks by their old MD5 ids! Need to re-build the graph.")
+                    self._stale_graph_file = True
+                    return False
+                self._graph = NetworkXStorage._intern_graph(graph)
+                self._mut_counter += 1
+                self._parsed_clusters = {}
                 logger.info(
-                    f"Successfully loaded graph from: {self.graphml_xml_file} with {self._graph.number_of_nodes()} nodes and {self._graph.number_of_edges()} edges")
+                    f"Successfully loaded graph from: {graph_file} with {self._graph.number_of_nodes()} nodes and {self._graph.number_of_edges()} edges")
+                if from_graphml:
+                    logger.info(f"Migrating the GraphML graph into {self.nx_graph_file}")
+                    NetworkXStorage.write_nx_graph(self._graph, self.nx_graph_file)
                 return True
             except Exception as e:
                 logger.error(
-                    f"Failed to load graph from: {self.graphml_xml_file} with {e}! Need to re-build the graph.")
+                    f"Failed to load graph from: {graph_file} with {e}! Need to re-build the graph.")
                 return False
         else:
-            # GraphML file doesn't exist; need to construct the graph from scratch
-            logger.info("GraphML file does not exist! Need to build the graph from scratch.")
+            # Graph file doesn't exist; need to construct the graph from scratch
+            logger.info("Graph file does not exist! Need to build the graph from scratch.")
             return False
 
+    @staticmethod
+    def _has_legacy_chunk_ids(graph: nx.Graph) -> bool:
+        # Every node of a graph is built from the same chunking, so the first "source_id" decides
+        for _, source_id in graph.nodes(data="source_id"):
+            if source_id:
+                return _LEGACY_CHUNK_ID_PATTERN.match(source_id) is not None
+        return False
+
+    @staticmethod
+    def read_nx_graph(file_name) -> nx.Graph:
+        with open(file_name, "rb") as file:
+            return pickle.load(file)
+
     @staticmethod
     def write_nx_graph(graph: nx.Graph, file_name):
         logger.info(
             f"Writing graph with {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges"
         )
-        nx.write_graphml(graph, file_name)
+        with open(file_name, "wb") as file:
+            pickle.dump(graph, file, protocol=5)
 
-    @model_validator(mode="after")
-    def _register_node2emb(cls, data):
-        cls._node_embed_algorithms = {
-            "node2vec": data._node2vec_embed,
-        }
+    @staticmethod
+    def _intern(value):
+        return sys.intern(value) if isinstance(value, str) else value
+
+    @staticmethod
+    def _intern_attrs(data: dict, keys: tuple[str, ...]) -> dict:
+        # Entity names repeat across nodes, edges and queries; interning shares one copy and speeds up lookups
+        for key in keys:
+            if key in data:
+                data[key] = NetworkXStorage._intern(data[key])
         return data
 
+    @staticmethod
+    def _intern_graph(graph: nx.Graph) -> nx.Graph:
+        intern, intern_attrs = NetworkXStorage._intern, NetworkXStorage._intern_attrs
+        interned = graph.__class__()
+        interned.graph.update(graph.graph)
+        interned.add_nodes_from((intern(node), intern_attrs(data, ("entity_name",)))
+                                for node, data in graph.nodes(data=True))
+        interned.add_edges_from((intern(u), intern(v), intern_attrs(data, ("src_id", "tgt_id")))
+                                for u, v, data in graph.edges(data=True))
+        return interned
+
     @property
-    def graphml_xml_file(self):
+    def nx_graph_file(self):
         assert self.namespace is not None
         return self.namespace.get_save_path(self.name)
 
+    @property
+    def graphml_xml_file(self):
+        assert self.namespace is not None
+        return self.namespace.get_save_path(self.graphml_name)
+
     @staticmethod
     def _stabilize_graph(graph: nx.Graph) -> nx.Graph:
         """Refer to https://github.com/microsoft/graphrag/index/graph/utils/stable_lcc.py
@@ -66,28 +162,22 @@ class NetworkXStorage(BaseGraphStorage):
         """
         fixed_graph = nx.DiGraph() if graph.is_directed() else nx.Graph()
 
-        sorted_nodes = graph.nodes(data=True)
-        sorted_nodes = sorted(sorted_nodes, key=lambda x: x[0])
+        nodes = list(graph.nodes(data=True))
+        node_keys = np.array([str(node[0]) for node in nodes], dtype=str)
+        fixed_graph.add_nodes_from(nodes[i] for i in np.argsort(node_keys, kind="stable"))
 
-        fixed_graph.add_nodes_from(sorted_nodes)
         edges = list(graph.edges(data=True))
-
-        if not graph.is_directed():
-
-            def _sort_source_target(edge):
-                source, target, edge_data = edge
-                if source > target:
-                    temp = source
-                    source = target
-                    target = temp
-                return source, target, edge_data
-
-            edges = [_sort_source_target(edge) for edge in edges]
-
-        def _get_edge_key(source: Any, target: Any) -> str:
-            return f"{source} -> {target}"
-
-        edges = sorted(edges, key=lambda x: _get_edge_key(x[0], x[1]))
+        if edges:
+            # Sort by (source, target) in C over unicode arrays instead of building a key string per edge
+            sources = np.array([str(edge[0]) for edge in edges], dtype=str)
+            targets = np.array([str(edge[1]) for edge in edges], dtype=str)
+            if not graph.is_directed():
+                swap = sources > targets
+                # np.where widens to the larger of the two fixed-width dtypes, so swapped keys are not truncated
+                sources, targets = np.where(swap, targets, sources), np.where(swap, sources, targets)
+                edges = [(target, source, edge_data) if swapped else (source, target, edge_data)
+                         for (source, target, edge_data), swapped in zip(edges, swap)]
+            edges = [edges[i] for i in np.lexsort((targets, sources))]
 
         fixed_graph.add_edges_from(edges)
         return fixed_graph
@@ -104,58 +194,103 @@ class NetworkXStorage(BaseGraphStorage):
         return self._graph
 
     async def _persist(self, force):
-        if os.path.exists(self.graphml_xml_file) and not force:
+        if os.path.exists(self.nx_graph_file) and not force and not self._stale_graph_file:
             return
-        logger.info(f"Writing graph into {self.graphml_xml_file}")
-        NetworkXStorage.write_nx_graph(self.graph, self.graphml_xml_file)
+        logger.info(f"Writing graph into {self.nx_graph_file}")
+        NetworkXStorage.write_nx_graph(self.graph, self.nx_graph_file)
+        self._stale_graph_file = False
 
-    async def has_node(self, node_id: str) -> bool:
+    # The accessors below do no I/O; the `*_sync` variants let internal hot loops skip the coroutine overhead,
+    # while the async methods keep the `BaseGraphStorage` interface.
+    def has_node_sync(self, node_id: str) -> bool:
         return self._graph.has_node(node_id)
 
-    async def has_edge(self, source_node_id: str, target_node_id: str) -> bool:
+    def has_edge_sync(self, source_node_id: str, target_node_id: str) -> bool:
         return self._graph.has_edge(source_node_id, target_node_id)
 
-    async def get_node(self, node_id: str) -> Union[dict, None]:
+    def get_node_sync(self, node_id: str) -> Union[dict, None]:
         return self._graph.nodes.get(node_id)
 
-    async def node_degree(self, node_id: str) -> int:
+    def node_degree_sync(self, node_id: str) -> int:
+        self._ensure_csr()
+        idx = self._node_id_to_idx.get(node_id)
         # [numberchiffre]: node_id not part of graph returns `DegreeView({})` instead of 0
-        return self._graph.degree(node_id) if self._graph.has_node(node_id) else 0
+        return int(self._csr_degree[idx]) if idx is not None else 0
+
+    def edge_degree_sync(self, src_id: str, tgt_id: str) -> int:
+        return self.node_degree_sync(src_id) + self.node_degree_sync(tgt_id)
+
+    def get_edge_weight_sync(self, source_node_id: str, target_node_id: str) -> Union[float, None]:
+        edge_data = self._graph.edges.get((source_node_id, target_node_id))
+        return edge_data.get("weight") if edge_data is not None else None
+
+    def get_edge_sync(self, source_node_id: str, target_node_id: str) -> Union[dict, None]:
+        return self._graph.edges.get((source_node_id, target_node_id))
+
+    async def has_node(self, node_id: str) -> bool:
+        return self.has_node_sync(node_id)
+
+    async def has_edge(self, source_node_id: str, target_node_id: str) -> bool:
+        return self.has_edge_sync(source_node_id, target_node_id)
+
+    async def get_node(self, node_id: str) -> Union[dict, None]:
+        return self.get_node_sync(node_id)
+
+    async def node_degree(self, node_id: str) -> int:
+        return self.node_degree_sync(node_id)
 
     async def edge_degree(self, src_id: str, tgt_id: str) -> int:
-        return (self._graph.degree(src_id) if self._graph.has_node(src_id) else 0) + (
-            self._graph.degree(tgt_id) if self._graph.has_node(tgt_id) else 0
-        )
+        return self.edge_degree_sync(src_id, tgt_id)
 
     async def get_edge_weight(
             self, source_node_id: str, target_node_id: str
     ) -> Union[float, None]:
-        edge_data = self._graph.edges.get((source_node_id, target_node_id))
-        return edge_data.get("weight") if edge_data is not None else None
+        return self.get_edge_weight_sync(source_node_id, target_node_id)
 
     async def get_edge(
             self, source_node_id: str, target_node_id: str
     ) -> Union[dict, None]:
-        return self._graph.edges.get((source_node_id, target_node_id))
+        return self.get_edge_sync(source_node_id, target_node_id)
+
+    def _csr_node_edges(self, idx: int) -> list[tuple[str, str]]:
+        node_id = self._node_ids[idx]
+        return [(node_id, self._node_ids[j]) for j in self._csr_indices[self._csr_indptr[idx]:self._csr_indptr[idx + 1]]]
 
     async def get_node_edges(self, source_node_id: str):
-        if self._graph.has_node(source_node_id):
-            return list(self._graph.edges(source_node_id))
+        self._ensure_csr()
+        idx = self._node_id_to_idx.get(source_node_id)
+        if idx is not None:
+            return self._csr_node_edges(idx)
         return None
 
     async def upsert_node(self, node_id: str, node_data: dict):
-        self._graph.add_node(node_id, **node_data)
+        self._graph.add_node(self._intern(node_id), **self._intern_attrs(node_data, ("entity_name",)))
+        self._mut_counter += 1
 
     # TODO: not use dict for edge_data
     async def upsert_edge(
             self, source_node_id: str, target_node_id: str, edge_data: dict
     ):
-        self._graph.add_edge(source_node_id, target_node_id, **edge_data)
+        self._graph.add_edge(self._intern(source_node_id), self._intern(target_node_id),
+                             **self._intern_attrs(edge_data, ("src_id", "tgt_id")))
+        self._mut_counter += 1
+
+    async def upsert_nodes(self, items: list[tuple[str, dict]]):
+        self._graph.add_nodes_from((self._intern(node_id), self._intern_attrs(node_data, ("entity_name",)))
+                                   for node_id, node_data in items)
+        self._mut_counter += 1
+
+    async def upsert_edges(self, items: list[tuple[str, str, dict]]):
+        self._graph.add_edges_from((self._intern(src_id), self._intern(tgt_id),
+                                    self._intern_attrs(edge_data, ("src_id", "tgt_id")))
+                                   for src_id, tgt_id, edge_data in items)
+        self._mut_counter += 1
 
     async def _cluster_data_to_subgraphs(self, cluster_data: dict[str, list[dict[str, str]]]):
      
         for node_id, clusters in cluster_data.items():
             self._graph.nodes[node_id]["clusters"] = json.dumps(clusters)
+            self._parsed_clusters[node_id] = clusters
         logger.info(f"Rewrite the graph with cluster data")
         await self._persist(force=True)
 
@@ -164,17 +299,151 @@ class NetworkXStorage(BaseGraphStorage):
             raise ValueError(f"Node embedding algorithm {algorithm} not supported")
         return await self._node_embed_algorithms[algorithm]()
 
+    def _build_csr(self):
+        """Snapshot the adjacency as CSR arrays (int32 indptr/indices, float32 weights) over sorted node ids."""
+        self._node_ids = sorted(self._graph.nodes())
+        self._node_id_to_idx = {node_id: idx for idx, node_id in enumerate(self._node_ids)}
+        adjacency = nx.to_scipy_sparse_array(self._graph, nodelist=self._node_ids, weight="weight", format="csr")
+        adjacency.sort_indices()
+        self._csr_indptr = adjacency.indptr.astype(np.int32)
+        self._csr_indices = adjacency.indices.astype(np.int32)
+        self._csr_data = adjacency.data.astype(np.float32)
+        self._csr_degree = np.diff(self._csr_indptr)
+        if self._graph.is_directed():
+            # Rows only hold the out-edges; NetworkX's degree also counts the in-edges (a self-loop is both)
+            self._csr_degree += np.bincount(self._csr_indices, minlength=len(self._node_ids)).astype(np.int32)
+        else:
+            # NetworkX counts a self-loop twice towards the degree
+            for node_id in nx.nodes_with_selfloops(self._graph):
+                self._csr_degree[self._node_id_to_idx[node_id]] += 1
+        self._csr_version = self._mut_counter
+
+    def _ensure_csr(self):
+        if self._csr_version != self._mut_counter:
+            self._build_csr()
+
+    def _gpu_random_walks(self, sampling_nodes: np.ndarray, walk_length: int, p: float, q: float):
+        """Run the node2vec walks on the GPU with cuGraph; returns None when cuGraph/CUDA is unavailable."""
+        try:
+            import cupy
+            import pylibcugraph
+
+            if cupy.cuda.runtime.getDeviceCount() == 0:
+                return None
+        except Exception:
+            return None
+
+        # cuGraph only knows vertices that appear in an edge, so walks from isolated nodes are filled on the host
+        has_neighbors = self._csr_indptr[sampling_nodes + 1] > self._csr_indptr[sampling_nodes]
+        walks = [[node] * walk_length for node in sampling_nodes[~has_neighbors].tolist()]
+        seeds = sampling_nodes[has_neighbors]
+        if len(seeds) == 0:
+            return walks
+        try:
+            handle = pylibcugraph.ResourceHandle()
+            sources = np.repeat(np.arange(len(self._node_ids), dtype=np.int32), np.diff(self._csr_indptr))
+            graph = pylibcugraph.SGGraph(
+                handle,
+                pylibcugraph.GraphProperties(is_symmetric=not self._graph.is_directed(), is_multigraph=False),
+                cupy.asarray(sources),
+                cupy.asarray(self._csr_indices),
+                cupy.asarray(self._csr_data),
+                store_transposed=False,
+                renumber=False,
+                do_expensive_check=False,
+            )
+            paths, _, path_sizes = pylibcugraph.node2vec(handle, graph, cupy.asarray(seeds), walk_length, True, p, q)
+        except Exception as e:
+            logger.warning(f"cuGraph node2vec failed with {e}, falling back to the CPU random walks.")
+            return None
+        paths, path_sizes = cupy.asnumpy(paths), cupy.asnumpy(path_sizes)
+        walks.extend(walk.tolist() for walk in np.split(paths, np.cumsum(path_sizes)[:-1]))
+        return walks
+
+    @property
+    def node2vec_file(self):
+        return self.namespace.get_save_path(self.node2vec_name) if self.namespace is not None else None
+
+    def _graph_signature(self, params_hash: str) -> str:
+        """Digest of the CSR snapshot and node2vec parameters; generations restart per process, this does not."""
+        digest = hashlib.blake2b(params_hash.encode(), digest_size=16)
+        digest.update("\n".join(self._node_ids).encode())
+        for array in (self._csr_indptr, self._csr_indices, self._csr_data):
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
     async def _node2vec_embed(self):
-        pass
+        params_hash = hashlib.blake2b(json.dumps(self.node2vec_params, sort_keys=True).encode()).hexdigest()
+        cache_key = (self._mut_counter, params_hash)
+        if self._node2vec_cache is not None and self._node2vec_cache[0] == cache_key:
+            _, embeddings, node_ids = self._node2vec_cache
+            return embeddings, list(node_ids)
+
+        self._ensure_csr()
+        signature = self._graph_signature(params_hash)
+        cache_file = self.node2vec_file
+        embeddings = None
+        if cache_file is not None and os.path.exists(cache_file):
+            try:
+                with np.load(cache_file) as cached:
+                    if str(cached["signature"]) == signature:
+                        embeddings = cached["embeddings"]
+                        logger.info(f"Loaded node2vec embeddings from: {cache_file}")
+            except Exception as e:
+                logger.warning(f"Failed to load node2vec embeddings from: {cache_file} with {e}")
+        if embeddings is None:
+            embeddings = self._train_node2vec()
+            if cache_file is not None:
+                np.savez_compressed(cache_file, embeddings=embeddings, nodes=np.array(self._node_ids),
+                                    signature=np.array(signature))
+        self._node2vec_cache = (cache_key, embeddings, list(self._node_ids))
+        return embeddings, list(self._node_ids)
+
+    def _train_node2vec(self) -> np.ndarray:
+        from gensim.models import Word2Vec
+
+        params = self.node2vec_params
+        num_nodes = len(self._node_ids)
+        sampling_nodes = np.tile(np.arange(num_nodes, dtype=np.int32), params["num_walks"])
+        deterministic = params.get("deterministic", False)
+        walks = None if deterministic else self._gpu_random_walks(sampling_nodes, params["walk_length"],
+                                                                  params["p"], params["q"])
+        if walks is None:
+            from Core.Utils.RandomWalk import csr_random_walk
+
+            walks = csr_random_walk(self._csr_data, self._csr_indptr, self._csr_indices, sampling_nodes,
+                                    params["walk_length"], params["p"], params["q"], params["random_seed"]).tolist()
+        model = Word2Vec(
+            sentences=walks,
+            vector_size=params["dimensions"],
+            window=params["window_size"],
+            min_count=0,
+            sg=1,
+            epochs=params["iterations"],
+            seed=params["random_seed"],
+            workers=1 if deterministic else os.cpu_count(),
+        )
+        # Every node starts `num_walks` walks, so each one is in the vocabulary
+        return model.wv[list(range(num_nodes))]
+
+    @staticmethod
+    def _largest_connected_component(graph: nx.Graph) -> nx.Graph:
+        """Find the largest (weakly) connected component with igraph's C implementation."""
+        if graph.number_of_nodes() == 0:
+            return graph
+        node_ids = list(graph.nodes())
+        node_idx = {node_id: idx for idx, node_id in enumerate(node_ids)}
+        ig_graph = ig.Graph(n=len(node_ids), edges=[(node_idx[u], node_idx[v]) for u, v in graph.edges()],
+                            directed=graph.is_directed())
+        largest_cc = max(ig_graph.connected_components(mode="weak"), key=len)
+        return graph.subgraph(node_ids[idx] for idx in largest_cc)
 
     def stable_largest_connected_component(graph: nx.Graph) -> nx.Graph:
         """Refer to https://github.com/microsoft/graphrag/index/graph/utils/stable_lcc.py
         Return the largest connected component of the graph, with nodes and edges sorted in a stable way.
         """
-        from graspologic.utils import largest_connected_component
-
-        graph = graph.copy()
-        graph = cast(nx.Graph, largest_connected_component(graph))
+        # No defensive copy: the component is a subgraph view and `relabel_nodes` below returns a fresh graph
+        graph = NetworkXStorage._largest_connected_component(graph)
         node_mapping = {node: html.unescape(node.upper().strip()) for node in graph.nodes()}  # type: ignore
         graph = nx.relabel_nodes(graph, node_mapping)
         return NetworkXStorage._stabilize_graph(graph)
@@ -185,11 +454,8 @@ class NetworkXStorage(BaseGraphStorage):
         return self._graph.nodes()
     #TODO: remove to the basegraph class 
     async def get_nodes_data(self):
-        node_list = list(self._graph.nodes())
-        
-        async def get_node_data(node_id):
-   
-            node_data = await self.get_node(node_id)
+        def with_content(node_data):
+            node_data = dict(node_data)
             if "entity_name" not in node_data: node_data["entity_name"] = ""
             elif node_data.get("description", "") == "":
                 node_data["content"] = node_data["entity_name"]
@@ -197,44 +463,68 @@ class NetworkXStorage(BaseGraphStorage):
                 node_data["content"] = "{entity}: {description}".format(entity=node_data["entity_name"],
                                                                         description=node_data["description"])
             return node_data
-        nodes = await asyncio.gather(*[get_node_data(node) for node in node_list])
 
-        return nodes
+        return [with_content(node_data) for _, node_data in self._graph.nodes(data=True)]
 
     async def get_edges_data(self, need_content = True):
-        edge_list = list(self._graph.edges())
-        edges = []
-        async def get_edge_data(edge_id):
-            edge_data = await self.get_edge(edge_id[0], edge_id[1])
-            if need_content:
-                description = edge_data.get("description", "")
-                relation_name = edge_data.get("relation_name", "")
-                keywords = edge_data.get("keywords", "")
-                if relation_name != "":
-                    edge_data["content"] = relation_name
-                else:
-                    edge_data["content"] = "{keywords} {src_id} {tgt_id} {description}".format(
-                        keywords=keywords, src_id=edge_data["src_id"], tgt_id=edge_data["tgt_id"],
-                        description=description)
-            edges.append(edge_data)
-        await asyncio.gather(*[get_edge_data(edge) for edge in edge_list])  
-        return edges
+        def with_content(edge_data):
+            edge_data = dict(edge_data)
+            description = edge_data.get("description", "")
+            relation_name = edge_data.get("relation_name", "")
+            keywords = edge_data.get("keywords", "")
+            if relation_name != "":
+                edge_data["content"] = relation_name
+            else:
+                edge_data["content"] = "{keywords} {src_id} {tgt_id} {description}".format(
+                    keywords=keywords, src_id=edge_data["src_id"], tgt_id=edge_data["tgt_id"],
+                    description=description)
+            return edge_data
+
+        if not need_content:
+            return [edge_data for _, _, edge_data in self._graph.edges(data=True)]
+        return [with_content(edge_data) for _, _, edge_data in self._graph.edges(data=True)]
 
     async def get_stable_largest_cc(self):
-        return NetworkXStorage.stable_largest_connected_component(self._graph)
+        if self._lcc_cache is not None and self._lcc_cache[0] == self._mut_counter:
+            return self._lcc_cache[1]
+        largest_cc = NetworkXStorage.stable_largest_connected_component(self._graph)
+        self._lcc_cache = (self._mut_counter, largest_cc)
+        return largest_cc
 
     async def cluster_data_to_subgraphs(self, cluster_data):
         await self._cluster_data_to_subgraphs(cluster_data)
 
+    def _community_bitsets(self, schemas: dict[str, LeidenInfo]) -> tuple[dict[str, int], np.ndarray]:
+        """Pack the node set of every community into a row of uint64 words indexed by CSR node index."""
+        cluster_pos = {cluster_key: pos for pos, cluster_key in enumerate(schemas)}
+        bitsets = np.zeros((len(schemas), (len(self._node_ids) + 63) // 64), dtype=np.uint64)
+        for cluster_key, schema in schemas.items():
+            node_idx = np.fromiter((self._node_id_to_idx[n] for n in schema.nodes), dtype=np.uint64,
+                                   count=len(schema.nodes))
+            np.bitwise_or.at(bitsets[cluster_pos[cluster_key]], (node_idx >> np.uint64(6)).astype(np.intp),
+                             np.uint64(1) << (node_idx & np.uint64(63)))
+        return cluster_pos, bitsets
+
     async def get_community_schema(self):
-        max_num_ids = 0
         levels = defaultdict(set)
         _schemas: dict[str, LeidenInfo] = defaultdict(LeidenInfo)
-        for node_id, node_data in self._graph.nodes(data=True):
+        self._ensure_csr()
+        if self._node_chunk_ids_version != self._mut_counter:
+            self._node_chunk_ids = {}
+            self._node_chunk_ids_version = self._mut_counter
+        for idx, node_id in enumerate(self._node_ids):
+            node_data = self._graph.nodes[node_id]
             if "clusters" not in node_data:
                 continue
-            clusters = json.loads(node_data["clusters"])
-            this_node_edges = self._graph.edges(node_id)
+            clusters = self._parsed_clusters.get(node_id)
+            if clusters is None:
+                clusters = self._parsed_clusters[node_id] = json.loads(node_data["clusters"])
+            # Canonical (smaller, larger) endpoint order, computed once for all clusters of the node
+            this_node_edges = [(a, b) if a <= b else (b, a) for a, b in self._csr_node_edges(idx)]
+            node_chunk_ids = self._node_chunk_ids.get(node_id)
+            if node_chunk_ids is None:
+                node_chunk_ids = self._node_chunk_ids[node_id] = frozenset(
+                    map(sys.intern, node_data["source_id"].split(GRAPH_FIELD_SEP)))
 
             for cluster in clusters:
                 level = cluster["level"]
@@ -243,26 +533,50 @@ class NetworkXStorage(BaseGraphStorage):
                 _schemas[cluster_key].level = level
                 _schemas[cluster_key].title = f"Cluster {cluster_key}"
                 _schemas[cluster_key].nodes.add(node_id)
-                _schemas[cluster_key].edges.update(
-                    [tuple(sorted(e)) for e in this_node_edges]
-                )
-                _schemas[cluster_key].chunk_ids.update(
-                    node_data["source_id"].split(GRAPH_FIELD_SEP)
-                )
-                max_num_ids = max(max_num_ids, len(_schemas[cluster_key].chunk_ids))
-
+                _schemas[cluster_key].edges.update(this_node_edges)
+                _schemas[cluster_key].chunk_ids |= node_chunk_ids
+
+        max_num_ids = max((len(v.chunk_ids) for v in _schemas.values()), default=0)
+        # Bitsets cost one row of N/64 words per community; when communities are much smaller than that,
+        # `set.issubset` (which stops at the first node missing from the parent) is both smaller and faster
+        use_bitsets = sum(len(v.nodes) for v in _schemas.values()) >= len(_schemas) * ((len(self._node_ids) + 63) // 64)
+        if use_bitsets:
+            cluster_pos, bitsets = self._community_bitsets(_schemas)
         ordered_levels = sorted(levels.keys())
-        for i, curr_level in enumerate(ordered_levels[:-1]):
-            next_level = ordered_levels[i + 1]
-            this_level_comms = levels[curr_level]
-            next_level_comms = levels[next_level]
-            # compute the sub-communities by nodes intersection
-            for comm in this_level_comms:
-                _schemas[comm].sub_communities = [
-                    c
-                    for c in next_level_comms
-                    if _schemas[c].nodes.issubset(_schemas[comm].nodes)
-                ]
+        executor = None
+        try:
+            for i, curr_level in enumerate(ordered_levels[:-1]):
+                next_level = ordered_levels[i + 1]
+                this_level_comms = list(levels[curr_level])
+                next_level_comms = list(levels[next_level])
+
+                # compute the sub-communities by nodes intersection
+                parallel = False
+                if use_bitsets:
+                    next_level_bitsets = bitsets[[cluster_pos[c] for c in next_level_comms]]
+                    # NumPy only drops the GIL inside its kernels, so threads pay off once each parent's
+                    # AND/ANY over the children's rows is large; smaller blocks are dominated by dispatch
+                    parallel = (len(this_level_comms) > 1 and (os.cpu_count() or 1) > 1
+                                and next_level_bitsets.size >= self.parallel_bitset_words)
+
+                    def sub_communities_of(comm):
+                        # a child is a subset iff it has no bit outside the parent
+                        is_subset = ~np.any(next_level_bitsets & ~bitsets[cluster_pos[comm]], axis=1)
+                        return [c for c, sub in zip(next_level_comms, is_subset) if sub]
+                else:
+                    def sub_communities_of(comm):
+                        parent = _schemas[comm].nodes
+                        return [c for c in next_level_comms if _schemas[c].nodes.issubset(parent)]
+
+                if parallel and executor is None:
+                    executor = ThreadPoolExecutor()
+                results = executor.map(sub_communities_of, this_level_comms) if parallel else map(
+                    sub_communities_of, this_level_comms)
+                for comm, sub_communities in zip(this_level_comms, results):
+                    _schemas[comm].sub_communities = sub_communities
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
         for _, v in _schemas.items():
             v.edges = list(v.edges)
@@ -321,4 +635,4 @@ class NetworkXStorage(BaseGraphStorage):
     async def get_node_by_index(self, index): 
         if self.node_list is None:
             self.node_list = list(self._graph.nodes())
-        return await self.get_node(self.node_list[index])
\ No newline at end of file
+        return self.get_node_sync(self.node_list[index])
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Numba kernels for (biased) random walks over a CSR adjacency.
+Refer to graph2vec (https://github.com/VHRanger/graph2vec) and PecanPy (https://github.com/krishnanlab/PecanPy)
+"""
+import numpy as np
+from numba import jit, prange
+
+
+@jit(nopython=True, nogil=True, fastmath=True)
+def _is_neighbor(Tindptr, Tindices, node, candidate):
+    # CSR column indices are sorted per row, so membership is a binary search
+    lo, hi = Tindptr[node], Tindptr[node + 1]
+    pos = np.searchsorted(Tindices[lo:hi], candidate)
+    return pos < hi - lo and Tindices[lo + pos] == candidate
+
+
+@jit(nopython=True, nogil=True, fastmath=True)
+def _weighted_choice(weights):
+    cdf = np.cumsum(weights)
+    if cdf[-1] <= 0:
+        return np.random.randint(len(weights))
+    return np.searchsorted(cdf, np.random.random() * cdf[-1], side="right")
+
+
+@jit(nopython=True, parallel=True, nogil=True, fastmath=True)
+def csr_random_walk(Tdata, Tindptr, Tindices, sampling_nodes, walklen, p=1.0, q=1.0, seed=-1):
+    """
+    Generate one weighted random walk per sampling node.
+
+    Args:
+        Tdata, Tindptr, Tindices: The CSR arrays of the (weighted) adjacency matrix.
+        sampling_nodes: The start node of each walk.
+        walklen: The length of each walk.
+        p: node2vec return parameter (1.0 disables the bias).
+        q: node2vec in-out parameter (1.0 disables the bias).
+        seed: Seed of numba's RNG; a non-negative value makes the walks reproducible.
+
+    Returns:
+        An int32 matrix of shape (len(sampling_nodes), walklen). Walks reaching a node without
+        neighbors stay on that node.
+    """
+    n_walks = len(sampling_nodes)
+    res = np.empty((n_walks, walklen), dtype=np.int32)
+    biased = p != 1.0 or q != 1.0
+    for i in prange(n_walks):
+        if seed >= 0:
+            # numba keeps one RNG state per thread, so seed per walk to be independent of the scheduling
+            np.random.seed(seed + i)
+        state = sampling_nodes[i]
+        res[i, 0] = state
+        for k in range(1, walklen):
+            start, end = Tindptr[state], Tindptr[state + 1]
+            if start == end:
+                res[i, k] = state
+                continue
+            weights = Tdata[start:end].copy()
+            if biased and k > 1:
+                prev = res[i, k - 2]
+                for j in range(end - start):
+                    candidate = Tindices[start + j]
+                    if candidate == prev:
+                        weights[j] /= p
+                    elif not _is_neighbor(Tindptr, Tindices, prev, candidate):
+                        weights[j] /= q
+            state = Tindices[start + _weighted_choice(weights)]
+            res[i, k] = state
+    return res